@@ -1,276 +1,519 @@
 """
 POS Printer API using FastAPI
 """
-# pylint: disable=W0603,C0103
+# pylint: disable=C0103
 
-from typing import Any, Annotated
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Annotated, Callable
+import asyncio
+import atexit
+import importlib.util
+import io
+import json
 import logging
+import logging.handlers
 import os
+import queue
 import escpos.printer
 import escpos.exceptions
 import escpos.capabilities
+import escpos.constants
 import serial.serialutil
-from fastapi import FastAPI, Query, Response, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import Depends, FastAPI, Query, Request, Response, UploadFile
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import HTMLResponse
 import uvicorn
 from PIL import Image
 from dotenv import load_dotenv
 from customtypes import Alignments
-from models import Payload, Barcode, ImageSettings
-
-match os.getenv('LOG_LEVEL', 'INFO').upper():
-    case 'DEBUG':
-        user_log_level = logging.DEBUG
-    case 'INFO':
-        user_log_level = logging.INFO
-    case 'WARNING':
-        user_log_level = logging.WARNING
-    case 'ERROR':
-        user_log_level = logging.ERROR
-    case 'CRITICAL':
-        user_log_level = logging.CRITICAL
-    case _:
-        user_log_level = logging.INFO
+from models import Payload, Barcode, ImageSettings, PrinterSettings
+from printer import (AsyncEscposClient, DeviceEscposClient, PrinterPool,
+                     PrinterNotInitializedError)
+
+ENV_PATH = os.path.dirname(os.getcwd()) + '/.env'
+# Load .env before anything reads the environment, so LOG_LEVEL and ENV apply when run directly
+ENV_LOADED = __name__ == "__main__" and load_dotenv(ENV_PATH)
+
+user_log_level = logging.getLevelName(os.getenv('LOG_LEVEL', 'WARNING').upper())
+if not isinstance(user_log_level, int):
+    user_log_level = logging.WARNING
+log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+log_listener.start()
+atexit.register(log_listener.stop)
 logging.basicConfig(
     level=user_log_level,
     format="%(levelname)s: %(message)s",
+    handlers=[logging.handlers.QueueHandler(log_queue)],
 )
-
-app = FastAPI()
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(fastapi_app: FastAPI):
+    """
+    Initialize the printer in each worker and apply the default settings on startup
+    """
+    fastapi_app.state.config = {key: value for key, value in os.environ.items()
+                                if key.startswith('PRINTER_')}
+    fastapi_app.state.config_json = json.dumps(fastapi_app.state.config, ensure_ascii=False,
+                                               separators=(",", ":")).encode()
+    settings = get_settings()
+    pool = fastapi_app.state.pool = init_printer()
+    try:
+        if not await check_printer_initialized(pool):
+            raise PrinterNotInitializedError()
+        await send_copies(pool, render_default_settings(settings), 1)
+        logger.info("Printer initialized")
+    except PrinterNotInitializedError:
+        logger.error("Failed to initialize printer")
+    if DOCS_ENABLED:
+        openapi_json(fastapi_app.root_path.rstrip("/"))
+    yield
+    if pool is not None:
+        await pool.close()
+
+app = FastAPI(lifespan=lifespan, docs_url=None, redoc_url=None, openapi_url=None)
+DOCS_ENABLED = os.getenv('ENV') != 'prod'
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+SEND_BUFFER_SIZE = 1024 * 1024
+QR_CACHE_CONTENT_LENGTH = 256
+IMAGE_TYPES = frozenset({"image/png", "image/gif", "image/bmp", "image/jpg", "image/jpeg"})
+ROOT_ONLINE = json.dumps({"message": "Printer API is running", "printer_status": "online"},
+                         separators=(",", ":")).encode()
+ROOT_OFFLINE = json.dumps({"message": "Printer API is running, but no printer is initialized"},
+                          separators=(",", ":")).encode()
+NOT_INITIALIZED = json.dumps({"error": "Printer not initialized"}, separators=(",", ":")).encode()
+CONTENT_PRINTED = json.dumps({"status": "Content Printed"}, separators=(",", ":")).encode()
+BARCODE_PRINTED = json.dumps({"status": "Barcode Printed"}, separators=(",", ":")).encode()
+IMAGE_PRINTED = json.dumps({"status": "Image Printed"}, separators=(",", ":")).encode()
+PAPER_CUT = json.dumps({"status": "Paper Cut"}, separators=(",", ":")).encode()
+UNSUPPORTED_IMAGE = json.dumps(
+    {"error": "Unsupported image format. Supported formats are PNG, JPG, BMP, GIF."},
+    separators=(",", ":")).encode()
+IMAGE_TOO_LARGE = json.dumps(
+    {"error": f"Image too large. Maximum size is {MAX_IMAGE_SIZE} bytes."},
+    separators=(",", ":")).encode()
+
+@app.exception_handler(PrinterNotInitializedError)
+async def printer_not_initialized(_request: Request,
+                                  _exc: PrinterNotInitializedError) -> Response:
+    """
+    Respond to requests that need a printer when none is initialized
+    """
+    logger.warning("Printer not initialized")
+    return Response(content=NOT_INITIALIZED, status_code=400, media_type="application/json")
+
 @app.get("/", status_code=200)
-async def root(response: Response) -> Any:
+async def root(request: Request) -> Response:
     """
     Root Endpoint
     """
-    logging.info("Root endpoint called")
-    if check_printer_initialized():
-        logging.info("Printer status: online")
-        return {"message": "Printer API is running", "printer_status": "online"}
+    logger.info("Root endpoint called")
+    if await check_printer_initialized(request.app.state.pool):
+        logger.info("Printer status: online")
+        return Response(content=ROOT_ONLINE, media_type="application/json")
 
-    response.status_code = 400
-    logging.warning("Printer not initialized")
-    return {"message": "Printer API is running, but no printer is initialized"}
+    logger.warning("Printer not initialized")
+    return Response(content=ROOT_OFFLINE, status_code=400, media_type="application/json")
 
-def check_printer_initialized() -> bool:
+async def check_printer_initialized(pool: PrinterPool | None) -> bool:
     """
     Check if the printer is initialized
     """
-    if os.getenv('PRINTER_TYPE') == "dummy":
-        logging.info("Dummy printer in use")
-        return True
-    try:
-        PRINTER.is_online()
-        logging.info("Printer is online")
-        return True
-    except NotImplementedError:
-        logging.warning("Printer is offline")
-        return False
+    return pool is not None and await pool.is_online()
+
+async def get_printer(request: Request) -> PrinterPool:
+    """
+    Return the printer pool once the printer is known to be online
+    """
+    pool = request.app.state.pool
+    if not await check_printer_initialized(pool):
+        raise PrinterNotInitializedError()
+    return pool
+
+@lru_cache(maxsize=1)
+def get_settings() -> PrinterSettings:
+    """
+    Parse the printer settings from the environment once
+    """
+    return PrinterSettings()
+
+def new_job() -> escpos.printer.Dummy:
+    """
+    Create an in-memory ESC/POS job using the configured printer profile
+    """
+    return escpos.printer.Dummy(profile=get_settings().profile)
+
+def render(job: escpos.printer.Dummy) -> bytes:
+    """
+    Return the bytes rendered into a job and clear it for the next section
+    """
+    output = job.output
+    job.clear()
+    return output
+
+def render_text(text: str) -> bytes:
+    """
+    Encode text for the printer, skipping codepage detection for plain ASCII
+    """
+    if text.isascii():
+        return text.encode('ascii')
+    job = new_job()
+    job.text(text)
+    return job.output
+
+def render_alignment(alignment: str) -> bytes:
+    """
+    Render only the justification command, leaving the other text styles untouched
+    """
+    return escpos.constants.TXT_STYLE['align'][alignment]
+
+@lru_cache(maxsize=1)
+def render_cut() -> bytes:
+    """
+    Render the paper cut command for the configured printer profile
+    """
+    job = new_job()
+    job.cut()
+    return job.output
+
+def render_qr(content: str, size: int, center: bool) -> bytes:
+    """
+    Render a QR code, caching short codes so repeats skip encoding and rasterization
+    """
+    if len(content) > QR_CACHE_CONTENT_LENGTH:
+        return render_qr_uncached(content, size, center)
+    return render_qr_cached(content, size, center)
+
+def render_qr_uncached(content: str, size: int, center: bool) -> bytes:
+    """
+    Render a QR code
+    """
+    job = new_job()
+    job.qr(content, size=size, center=center)
+    return job.output
+
+render_qr_cached = lru_cache(maxsize=32)(render_qr_uncached)
+
+def render_payload(payload: Payload) -> bytes:
+    """
+    Render one copy of a text or QR payload
+    """
+    if not payload.qr:
+        one_copy = render_text(payload.content + "\n")
+    else:
+        center = bool(payload.alignment == Alignments.CENTER)
+        one_copy = render_qr(payload.content, payload.size, center)
+    if payload.cut:
+        one_copy += render_cut()
+    return one_copy
+
+def render_barcode(barcode: Barcode) -> bytes:
+    """
+    Render one copy of a barcode
+    """
+    job = new_job()
+    job.barcode(barcode.code,
+                barcode.type,
+                height=barcode.height,
+                width=barcode.width,
+                align_ct=barcode.center)
+    one_copy = render(job)
+    if barcode.cut:
+        one_copy += render_cut()
+    return one_copy
+
+def render_image(image: Image.Image, imagesettings: ImageSettings) -> bytes:
+    """
+    Render one copy of an image
+    """
+    job = new_job()
+    width = job.profile.profile_data['media']['width']['pixels']
+    if width != "Unknown":
+        width = int(width)
+        image.draft('L', (width, 1))
+        if image.width > width:
+            image = image.resize((width, max(1, image.height * width // image.width)),
+                                 Image.Resampling.LANCZOS)
+    job.image(image,
+              high_density_vertical=imagesettings.high_density_vertical,
+              high_density_horizontal=imagesettings.high_density_horizontal,
+              impl=imagesettings.impl,
+              center=imagesettings.center)
+    one_copy = render(job)
+    if imagesettings.cut:
+        one_copy += render_cut()
+    return one_copy
+
+async def send_copies(pool: PrinterPool, one_copy: bytes, copies: int,
+                      header: bytes = b"", footer: bytes = b"") -> None:
+    """
+    Send copies of a rendered job, batching small copies without holding large ones in memory
+    """
+    async with pool.acquire() as client:
+        if len(one_copy) > SEND_BUFFER_SIZE:
+            for data in (header, *(one_copy for _ in range(copies)), footer):
+                if data:
+                    await client.send(data)
+            return
+        batch = SEND_BUFFER_SIZE // max(1, len(one_copy))
+        for sent in range(0, copies, batch):
+            count = min(batch, copies - sent)
+            await client.send(b"".join((header if sent == 0 else b"", one_copy * count,
+                                        footer if sent + count == copies else b"")))
+
+@lru_cache(maxsize=8)
+def openapi_json(root_path: str) -> bytes:
+    """
+    Render the OpenAPI schema once per root path, listing the root path as the server
+    """
+    schema = app.openapi()
+    if root_path:
+        schema = {**schema, "servers": [{"url": root_path}]}
+    return json.dumps(schema, ensure_ascii=False, separators=(",", ":")).encode()
+
+@lru_cache(maxsize=8)
+def swagger_ui_html(root_path: str) -> bytes:
+    """
+    Render the Swagger UI page once per root path
+    """
+    return get_swagger_ui_html(openapi_url=root_path + "/openapi.json",
+                               title=f"{app.title} - Swagger UI").body
+
+@lru_cache(maxsize=8)
+def redoc_html(root_path: str) -> bytes:
+    """
+    Render the ReDoc page once per root path
+    """
+    return get_redoc_html(openapi_url=root_path + "/openapi.json",
+                          title=f"{app.title} - ReDoc").body
+
+if DOCS_ENABLED:
+    @app.get("/openapi.json", include_in_schema=False)
+    async def openapi(request: Request) -> Response:
+        """
+        Serve the pre-rendered OpenAPI schema
+        """
+        return Response(content=openapi_json(request.scope.get("root_path", "").rstrip("/")),
+                        media_type="application/json")
+
+    @app.get("/docs", include_in_schema=False)
+    async def swagger_ui(request: Request) -> HTMLResponse:
+        """
+        Serve the Swagger UI page
+        """
+        return HTMLResponse(content=swagger_ui_html(request.scope.get("root_path", "").rstrip("/")))
+
+    @app.get("/redoc", include_in_schema=False)
+    async def redoc(request: Request) -> HTMLResponse:
+        """
+        Serve the ReDoc page
+        """
+        return HTMLResponse(content=redoc_html(request.scope.get("root_path", "").rstrip("/")))
 
 @app.get("/config", status_code=200)
-def get_config() -> Any:
+async def get_config(request: Request) -> Response:
     """
     Docstring for get_config
 
     :return: Description
-    :rtype: Any
+    :rtype: Response
     """
-    env_vars = {}
-    for key, value in os.environ.items():
-        if key.startswith('PRINTER_'):
-            env_vars[key] = value
-    logging.info("Current Environment Variables: %s", env_vars)
-    return JSONResponse(content=env_vars)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Current Environment Variables: %s", request.app.state.config)
+    return Response(content=request.app.state.config_json, media_type="application/json")
 
-@app.post("/print/", status_code=200)
-def print_text(payload: Annotated[Payload, Query()], response: Response) -> Any:
+@app.post("/print/", status_code=200, response_model=dict[str, str])
+async def print_text(payload: Annotated[Payload, Query()],
+                     pool: Annotated[PrinterPool, Depends(get_printer)]) -> Response:
     """
     Docstring for print_text
     
     :param payload: Description
     :type payload: Annotated[Payload, Query()]
     """
-    if not check_printer_initialized():
-        response.status_code = 400
-        return {"error": "Printer not initialized"}
-    logging.info("Setting alignment to %s", payload.alignment)
-    PRINTER.set(align=payload.alignment)
-    logging.info("Printing...")
-    for _ in range(payload.copies):
-        if not payload.qr:
-            PRINTER.text(payload.content + "\n")
-        else:
-            center = bool(payload.alignment == Alignments.CENTER)
-            PRINTER.qr(payload.content, size=payload.size, center=center)
-        if payload.cut:
-            logging.info("Cutting...")
-            PRINTER.cut()
-    PRINTER.set(align=os.getenv('PRINTER_ALIGNMENT', 'left'))
-    return {"status": "Content Printed"}
-
-@app.post("/barcode/", status_code=200)
-def print_barcode(barcode: Annotated[Barcode, Query()], response: Response) -> Any:
+    logger.info("Printing %d copies (alignment=%s, qr=%s, cut=%s)",
+                 payload.copies, payload.alignment, payload.qr, payload.cut)
+    one_copy = await asyncio.to_thread(render_payload, payload)
+    alignment = get_settings().alignment
+    footer = render_alignment(alignment) if payload.alignment != alignment else b""
+    await send_copies(pool, one_copy, payload.copies,
+                      header=render_alignment(payload.alignment), footer=footer)
+    return Response(content=CONTENT_PRINTED, media_type="application/json")
+
+@app.post("/barcode/", status_code=200, response_model=dict[str, str])
+async def print_barcode(barcode: Annotated[Barcode, Query()],
+                        pool: Annotated[PrinterPool, Depends(get_printer)],
+                        response: Response) -> Response | dict[str, str]:
     """
     Print a barcode
     """
-    if not check_printer_initialized():
-        response.status_code = 400
-        return {"error": "Printer not initialized"}
-    logging.info("Barcode type: %s", barcode.type.value)
+    logger.info("Printing %d %s barcode copies (cut=%s)",
+                 barcode.copies, barcode.type, barcode.cut)
     try:
-        for _ in range(barcode.copies):
-            logging.info("Printing barcode...")
-            PRINTER.barcode(barcode.code,
-                            barcode.type.value,
-                            height=barcode.height,
-                            width=barcode.width,
-                            align_ct=barcode.center)
-            if barcode.cut:
-                logging.info("Cutting...")
-                PRINTER.cut()
+        one_copy = await asyncio.to_thread(render_barcode, barcode)
     except (escpos.exceptions.BarcodeCodeError,
             escpos.exceptions.BarcodeSizeError,
             escpos.exceptions.BarcodeTypeError) as e:
-        logging.error("Barcode printing error: %s", str(e))
+        logger.error("Barcode printing error: %s", str(e))
         response.status_code = 400
         return {"error": f"Barcode printing error: {str(e)}"}
-    return {"status": "Barcode Printed"}
+    footer = render_alignment(get_settings().alignment) if barcode.center else b""
+    await send_copies(pool, one_copy, barcode.copies, footer=footer)
+    return Response(content=BARCODE_PRINTED, media_type="application/json")
 
-@app.post("/image/", status_code=200)
-def print_image(file: UploadFile,
-                imagesettings: Annotated[ImageSettings, Query()],
-                response: Response) -> Any:
+@app.post("/image/", status_code=200, response_model=dict[str, str])
+async def print_image(file: UploadFile,
+                      imagesettings: Annotated[ImageSettings, Query()],
+                      pool: Annotated[PrinterPool, Depends(get_printer)],
+                      response: Response) -> Response | dict[str, str]:
     """
     Print an image
     """
-    if not check_printer_initialized():
-        response.status_code = 400
-        return {"error": "Printer not initialized"}
-    if not file:
-        response.status_code = 400
-        return {"error": "No image file provided"}
-    if file.content_type not in ["image/png", "image/gif", "image/bmp", "image/jpg"]:
-        response.status_code = 400
-        return {"error": "Unsupported image format. Supported formats are PNG, JPG, BMP, GIF."}
-    image = Image.open(file.file)
+    if file.content_type not in IMAGE_TYPES:
+        return Response(content=UNSUPPORTED_IMAGE, status_code=400, media_type="application/json")
+    if file.size is not None and file.size > MAX_IMAGE_SIZE:
+        return Response(content=IMAGE_TOO_LARGE, status_code=400, media_type="application/json")
+    try:
+        content = await file.read()
+    finally:
+        await file.close()
+    logger.info("Printing %d image copies (cut=%s)", imagesettings.copies, imagesettings.cut)
     try:
-        for _ in range(imagesettings.copies):
-            logging.info("Printing image...")
-            PRINTER.image(image,
-                          high_density_vertical=imagesettings.high_density_vertical,
-                          high_density_horizontal=imagesettings.high_density_horizontal,
-                          impl=imagesettings.impl.value,
-                          center=imagesettings.center)
-            if imagesettings.cut:
-                logging.info("Cutting...")
-                PRINTER.cut()
-    except (escpos.exceptions.ImageWidthError, escpos.exceptions.ImageSizeError) as e:
-        logging.error("Image printing error: %s", str(e))
+        image = Image.open(io.BytesIO(content))
+        one_copy = await asyncio.to_thread(render_image, image, imagesettings)
+    except (escpos.exceptions.ImageWidthError, escpos.exceptions.ImageSizeError,
+            Image.DecompressionBombError, OSError) as e:
+        logger.error("Image printing error: %s", str(e))
         response.status_code = 400
         return {"error": f"Image printing error: {str(e)}"}
-    return {"status": "Image Printed"}
+    await send_copies(pool, one_copy, imagesettings.copies)
+    return Response(content=IMAGE_PRINTED, media_type="application/json")
 
-@app.post("/cut/", status_code=200)
-def cut_paper(response: Response) -> Any:
+@app.post("/cut/", status_code=200, response_model=dict[str, str])
+async def cut_paper(pool: Annotated[PrinterPool, Depends(get_printer)]) -> Response:
     """
     Cut the paper
     """
-    if not check_printer_initialized():
-        response.status_code = 400
-        return {"error": "Printer not initialized"}
-    logging.info("Cutting paper...")
-    PRINTER.cut()
-    return {"status": "Paper Cut"}
+    logger.info("Cutting paper...")
+    await send_copies(pool, render_cut(), 1)
+    return Response(content=PAPER_CUT, media_type="application/json")
+
+def init_network_printer() -> PrinterPool:
+    """
+    Initialize a pool of connections to a network printer
+    """
+    host = os.getenv('PRINTER_IP')
+    logger.info("Initializing network printer at %s", host)
+    timeout = float(os.getenv('PRINTER_NETWORK_TIMEOUT', '10'))
+    return PrinterPool(lambda: AsyncEscposClient(host, timeout=timeout),
+                       size=int(os.getenv('PRINTER_POOL_SIZE', '2')))
+
+def init_usb_printer() -> PrinterPool | None:
+    """
+    Initialize a USB printer
+    """
+    logger.info("Initializing USB printer")
+    try:
+        device = escpos.printer.Usb(os.getenv('PRINTER_USB_VENDOR_ID'),
+                                    os.getenv('PRINTER_USB_PRODUCT_ID'),
+                                    interface=os.getenv('PRINTER_USB_INTERFACE', None),
+                                    endpoint_in=os.getenv('PRINTER_USB_ENDPOINT_IN', None),
+                                    endpoint_out=os.getenv('PRINTER_USB_ENDPOINT_OUT', None),
+                                    profile=get_settings().profile)
+    except escpos.exceptions.USBNotFoundError as e:
+        logger.error(str(e))
+        return None
+    return PrinterPool(lambda: DeviceEscposClient(device), size=1)
 
-def init_printer():
+def init_serial_printer() -> PrinterPool | None:
+    """
+    Initialize a serial printer
+    """
+    logger.info("Initializing serial printer")
+    try:
+        device = escpos.printer.Serial(devfile=str(os.getenv('PRINTER_SERIAL_PORT')),
+                                       baudrate=int(os.getenv('PRINTER_SERIAL_BAUDRATE', '9600')),
+                                       bytesize=int(os.getenv('PRINTER_SERIAL_BYTESIZE', '8')),
+                                       parity=os.getenv('PRINTER_SERIAL_PARITY', 'N'),
+                                       stopbits=int(os.getenv('PRINTER_SERIAL_STOPBITS', '1')),
+                                       timeout=int(os.getenv('PRINTER_SERIAL_TIMEOUT', '1')),
+                                       dsrdtr=os.getenv('PRINTER_SERIAL_DSRDTR',
+                                                        'False') == 'True',
+                                       rtscts=os.getenv('PRINTER_SERIAL_RTSCTS',
+                                                        'False') == 'True',
+                                       profile=get_settings().profile)
+    except serial.serialutil.SerialException as e:
+        logger.error(str(e))
+        return None
+    return PrinterPool(lambda: DeviceEscposClient(device), size=1)
+
+def init_dummy_printer() -> PrinterPool:
+    """
+    Initialize an in-memory dummy printer
+    """
+    logger.info("Initializing dummy printer")
+    device = escpos.printer.Dummy()
+    return PrinterPool(lambda: DeviceEscposClient(device), size=1)
+
+PRINTER_FACTORIES: dict[str, Callable[[], PrinterPool | None]] = {
+    'network': init_network_printer,
+    'usb': init_usb_printer,
+    'serial': init_serial_printer,
+    'dummy': init_dummy_printer,
+}
+
+def init_printer() -> PrinterPool | None:
     """
     Initialize the printer from environment variables
     """
-    global PRINTER
-
-    match os.getenv('PRINTER_TYPE'):
-        case 'network':
-            logging.info("Initializing network printer")
-            try:
-                PRINTER = escpos.printer.Network(os.getenv('PRINTER_IP'),
-                                                 profile=os.getenv('PRINTER_PROFILE', None))
-            except ConnectionRefusedError as e:
-                logging.error("Network printer connection error: %s", str(e))
-        case 'usb':
-            logging.info("Initializing USB printer")
-            try:
-                PRINTER = escpos.printer.Usb(os.getenv('PRINTER_USB_VENDOR_ID'),
-                                            os.getenv('PRINTER_USB_PRODUCT_ID'),
-                                            interface=os.getenv('PRINTER_USB_INTERFACE',
-                                                                None),
-                                            endpoint_in=os.getenv('PRINTER_USB_ENDPOINT_IN',
-                                                                  None),
-                                            endpoint_out=os.getenv('PRINTER_USB_ENDPOINT_OUT',
-                                                                   None),
-                                            profile=os.getenv('PRINTER_PROFILE', None))
-            except escpos.exceptions.USBNotFoundError as e:
-                logging.error(str(e))
-        case 'serial':
-            logging.info("Initializing serial printer")
-            try:
-                PRINTER = escpos.printer.Serial(devfile=str(os.getenv('PRINTER_SERIAL_PORT')),
-                                                baudrate=int(os.getenv('PRINTER_SERIAL_BAUDRATE',
-                                                                       '9600')),
-                                                bytesize=int(os.getenv('PRINTER_SERIAL_BYTESIZE',
-                                                                       '8')),
-                                                parity=os.getenv('PRINTER_SERIAL_PARITY',
-                                                                 'N'),
-                                                stopbits=int(os.getenv('PRINTER_SERIAL_STOPBITS',
-                                                                       '1')),
-                                                timeout=int(os.getenv('PRINTER_SERIAL_TIMEOUT',
-                                                                      '1')),
-                                                dsrdtr=os.getenv('PRINTER_SERIAL_DSRDTR',
-                                                                'False') == 'True',
-                                                rtscts=os.getenv('PRINTER_SERIAL_RTSCTS',
-                                                                'False') == 'True',
-                                                profile=os.getenv('PRINTER_PROFILE', None))
-            except serial.serialutil.SerialException as e:
-                logging.error(str(e))
-        case 'dummy':
-            logging.info("Initializing dummy printer")
-            PRINTER = escpos.printer.Dummy()
-        case _:
-            logging.error("Unsupported or undefined PRINTER_TYPE")
-            raise SystemExit("Unsupported or undefined PRINTER_TYPE")
-
-    if check_printer_initialized():
-        logging.info("Printer initialized")
-    else:
-        logging.error("Failed to initialize printer")
+    factory = PRINTER_FACTORIES.get(os.getenv('PRINTER_TYPE', ''))
+    if factory is None:
+        logger.error("Unsupported or undefined PRINTER_TYPE")
+        raise SystemExit("Unsupported or undefined PRINTER_TYPE")
+    return factory()
 
+def render_default_settings(settings: PrinterSettings) -> bytes:
+    """
+    Render the default printer configuration
+    """
+    job = new_job()
     try:
-        logging.info("Setting default printer configurations")
-        PRINTER.set(
-            align=Alignments(os.getenv('PRINTER_ALIGNMENT', 'left')),
-            font=os.getenv('PRINTER_FONT', 'a').lower(),
-            bold=bool(os.getenv('PRINTER_BOLD', 'False')),
-            underline=int(os.getenv('PRINTER_UNDERLINE', '0')),
+        logger.info("Setting default printer configurations")
+        job.set(
+            align=settings.alignment,
+            font=settings.font.lower(),
+            bold=settings.bold,
+            underline=settings.underline,
             width=1,
             height=1,
             density=9,
-            invert=bool(os.getenv('PRINTER_INVERSE', 'False')),
-            flip=bool(os.getenv('PRINTER_FLIP', 'False')),
-            double_height=bool(os.getenv('PRINTER_DOUBLE_HEIGHT', 'False')),
-            double_width=bool(os.getenv('PRINTER_DOUBLE_WIDTH', 'False')),
+            invert=settings.inverse,
+            flip=settings.flip,
+            double_height=settings.double_height,
+            double_width=settings.double_width,
             custom_size=False
         )
     except escpos.capabilities.NotSupported as e:
-        logging.warning(str(e))
+        logger.warning(str(e))
+    return job.output
 
 if __name__ == "__main__":
-    PRINTER = escpos.printer.Dummy()
-    env_path = os.path.dirname(os.getcwd()) + '/.env'
-    if os.path.exists(env_path):
-        logging.info("Loading .env file")
-        load_dotenv(env_path)
+    if ENV_LOADED:
+        logger.info("Loaded .env file")
     else:
-        logging.info(".env file not found, using system environment variables")
-    init_printer()
+        logger.info(".env file not found, using system environment variables")
+    workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+    if workers > 1 and os.getenv('PRINTER_TYPE') in ('usb', 'serial'):
+        logger.warning("USB and serial printers can only be opened by a single worker")
+        workers = 1
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # A single worker serves this module's app; workers > 1 must re-import it by name
+    uvicorn.run(app if workers == 1 else "main:app",
+                host="0.0.0.0",
+                port=8000,
+                workers=workers,
+                loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+                http="httptools",
+                log_level=user_log_level)
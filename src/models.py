@@ -1,7 +1,8 @@
 """
 Models for POS Printer Bridge
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from customtypes import Alignments, Positions, BarcodeTypes, ImplTypes
 
 class Payload(BaseModel):
@@ -9,16 +10,21 @@ class Payload(BaseModel):
     Payload Model for Printing Text or QR Code
     """
     content: str = Field(description="Content to Print", title="Content")
-    copies: int = Field(ge=1, description="Number of Copies", title="Copies", default=1)
+    copies: int = Field(ge=1, le=500, description="Number of Copies", title="Copies",
+                        default=1)
     cut: bool = Field(description="Cut after each copy", title="Cut", default=True)
     alignment : Alignments = Field(description="Alignment of the output",
                                    title="Alignment",
-                                   default=Alignments.LEFT)
+                                   default=Alignments.LEFT.value)
     qr: bool = Field(description="Print as QR Code", title="QR", default=False)
     size: int = Field(ge=1, le=16, description="Size of the QR Code", title="Size", default=8)
 
-    model_config = {
-        "json_schema_extra": {
+    model_config = ConfigDict(
+        extra='forbid',
+        frozen=True,
+        validate_assignment=False,
+        use_enum_values=True,
+        json_schema_extra={
             "examples": [
                 {
                     "content": "Content to print",
@@ -30,7 +36,7 @@ class Payload(BaseModel):
                 }
             ]
         }
-    }
+    )
 
 class Barcode(BaseModel):
     """
@@ -44,13 +50,18 @@ class Barcode(BaseModel):
     width: int = Field(ge=2, le=6, description="Width of the Barcode", title="Width", default=3)
     position: Positions = Field(description="Position of the Human Readable Text",
                                 title="Position",
-                                default=Positions.BELOW)
+                                default=Positions.BELOW.value)
     center: bool = Field(description="Center the Barcode", title="Center", default=False)
-    copies: int = Field(ge=1, description="Number of Copies", title="Copies", default=1)
+    copies: int = Field(ge=1, le=500, description="Number of Copies", title="Copies",
+                        default=1)
     cut:  bool = Field(description="Cut after printing the barcode", title="Cut", default=True)
 
-    model_config = {
-        "json_schema_extra": {
+    model_config = ConfigDict(
+        extra='forbid',
+        frozen=True,
+        validate_assignment=False,
+        use_enum_values=True,
+        json_schema_extra={
             "examples": [
                 {
                     "code": "123456789012",
@@ -64,7 +75,7 @@ class Barcode(BaseModel):
                 }
             ]
         }
-    }
+    )
 
 class ImageSettings(BaseModel):
     """
@@ -76,13 +87,18 @@ class ImageSettings(BaseModel):
     high_density_horizontal: bool = Field(description="High Density Horizontal",
                                           title="High Density Horizontal", default=True)
     impl: ImplTypes = Field(description="Implementation Type", title="Implementation",
-                            default=ImplTypes.bitImageRaster)
+                            default=ImplTypes.bitImageRaster.value)
     center: bool = Field(description="Center the Image", title="Center", default=False)
-    copies: int = Field(ge=1, description="Number of Copies", title="Copies", default=1)
+    copies: int = Field(ge=1, le=500, description="Number of Copies", title="Copies",
+                        default=1)
     cut: bool = Field(description="Cut after printing the image", title="Cut", default=True)
 
-    model_config = {
-        "json_schema_extra": {
+    model_config = ConfigDict(
+        extra='forbid',
+        frozen=True,
+        validate_assignment=False,
+        use_enum_values=True,
+        json_schema_extra={
             "examples": [
                 {
                     "high_density_vertical": True,
@@ -94,4 +110,25 @@ class ImageSettings(BaseModel):
                 }
             ]
         }
-    }
+    )
+
+class PrinterSettings(BaseSettings):
+    """
+    Default printer settings read from PRINTER_* environment variables
+    """
+    profile: str | None = None
+    alignment: Alignments = Alignments.LEFT.value
+    font: str = 'a'
+    bold: bool = False
+    underline: int = Field(ge=0, le=2, default=0)
+    double_height: bool = False
+    double_width: bool = False
+    inverse: bool = False
+    flip: bool = False
+
+    model_config = SettingsConfigDict(
+        env_prefix='PRINTER_',
+        extra='ignore',
+        frozen=True,
+        use_enum_values=True,
+    )
@@ -0,0 +1,231 @@
+"""
+Printer transports for POS Printer Bridge
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable
+import asyncio
+import logging
+import socket
+import time
+import escpos.escpos
+import escpos.printer
+
+logger = logging.getLogger(__name__)
+
+class PrinterNotInitializedError(Exception):
+    """
+    Raised when a request needs a printer that is not initialized
+    """
+
+class AsyncEscposClient:
+    """
+    Non-blocking ESC/POS client for network printers
+    """
+    def __init__(self, host: str, port: int = 9100, timeout: float = 10.0) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+        self.lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        """
+        Open the TCP connection to the printer, replacing any stale connection
+        """
+        await self.close()
+        logger.info("Connecting to network printer at %s:%s", self.host, self.port)
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+        sock = self.writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if hasattr(socket, 'TCP_KEEPIDLE'):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+            if hasattr(socket, 'TCP_QUICKACK'):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+    async def is_online(self) -> bool:
+        """
+        Check if the connection to the printer is open
+        """
+        return (self.writer is not None
+                and not self.writer.is_closing()
+                and not self.reader.at_eof())
+
+    async def write(self, data: bytes) -> None:
+        """
+        Write data to the printer, giving up if it stops reading for longer than the timeout
+        """
+        self.writer.write(data)
+        await asyncio.wait_for(self.writer.drain(), self.timeout)
+
+    async def send(self, data: bytes) -> None:
+        """
+        Write a rendered ESC/POS job to the printer in a single write
+        """
+        async with self.lock:
+            try:
+                if not await self.is_online():
+                    await self.open()
+                try:
+                    await self.write(data)
+                except ConnectionError:
+                    logger.warning("Network printer connection lost, reconnecting")
+                    await self.open()
+                    await self.write(data)
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.error("Network printer error: %s", str(e) or "timed out")
+                await self.close()
+                raise PrinterNotInitializedError() from e
+
+    async def reset(self) -> None:
+        """
+        Drop a failed connection so the next send reconnects
+        """
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Close the TCP connection to the printer
+        """
+        if self.writer is not None:
+            if self.writer.transport.get_write_buffer_size():
+                # A printer that stopped reading would never let the unsent data flush
+                self.writer.transport.abort()
+            else:
+                self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.writer = None
+            self.reader = None
+
+class DeviceEscposClient:
+    """
+    ESC/POS client for USB, serial and dummy printers driven by python-escpos
+    """
+    def __init__(self, device: escpos.escpos.Escpos, status_ttl: float = 5.0) -> None:
+        self.device = device
+        self.lock = asyncio.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='printer')
+        self.status_ttl = status_ttl
+        self.online_until = 0.0
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking device call on this printer's own thread
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def open(self) -> None:
+        """
+        Local devices are opened by python-escpos when they are created
+        """
+
+    async def is_online(self) -> bool:
+        """
+        Check if the printer answers status queries, reusing a recent successful answer
+        """
+        if isinstance(self.device, escpos.printer.Dummy):
+            logger.info("Dummy printer in use")
+            return True
+        if time.monotonic() < self.online_until:
+            return True
+        try:
+            async with self.lock:
+                # Another request may have probed the device while this one waited
+                if time.monotonic() < self.online_until:
+                    return True
+                online = await self.run(self.device.is_online)
+        except NotImplementedError:
+            online = False
+        except OSError as e:
+            logger.error("Printer status error: %s", str(e))
+            online = False
+        if not online:
+            logger.warning("Printer is offline")
+            return False
+        logger.info("Printer is online")
+        self.online_until = time.monotonic() + self.status_ttl
+        return True
+
+    async def send(self, data: bytes) -> None:
+        """
+        Write a rendered ESC/POS job to the printer without blocking the event loop
+        """
+        async with self.lock:
+            await self.run(self.device._raw, data) # pylint: disable=W0212
+        self.online_until = time.monotonic() + self.status_ttl
+
+    async def reset(self) -> None:
+        """
+        Forget the cached status after a failure so the next request probes the device
+        """
+        self.online_until = 0.0
+
+    async def close(self) -> None:
+        """
+        Release the device and its thread
+        """
+        await self.run(self.device.close)
+        self.executor.shutdown()
+
+PrinterClient = AsyncEscposClient | DeviceEscposClient
+
+class PrinterPool:
+    """
+    Pool of persistent printer connections
+    """
+    def __init__(self, factory: Callable[[], PrinterClient], size: int = 2) -> None:
+        self.factory = factory
+        self.size = size
+        self.idle: asyncio.Queue[PrinterClient] = asyncio.Queue()
+        self.clients: list[PrinterClient] = []
+
+    async def is_online(self) -> bool:
+        """
+        Check if the printer is reachable, connecting if no connection is open
+        """
+        for client in self.clients:
+            if await client.is_online():
+                return True
+        try:
+            async with self.acquire() as client:
+                if not await client.is_online():
+                    await client.open()
+                return await client.is_online()
+        except OSError as e:
+            logger.error("Printer connection error: %s", str(e))
+            return False
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[PrinterClient]:
+        """
+        Borrow a connection from the pool, creating a new one while below size
+
+        Waiting for a busy connection is bounded by the clients' own timeouts, as a send
+        that cannot connect or write in time fails and returns its connection to the pool
+        """
+        if self.idle.empty() and len(self.clients) < self.size:
+            client = self.factory()
+            self.clients.append(client)
+        else:
+            client = await self.idle.get()
+        try:
+            yield client
+        except OSError:
+            await client.reset()
+            raise
+        finally:
+            self.idle.put_nowait(client)
+
+    async def close(self) -> None:
+        """
+        Close every connection in the pool
+        """
+        for client in self.clients:
+            await client.close()